@@ -0,0 +1,181 @@
+"""Admission control for the QA application."""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES: Dict[str, int] = {"high": 0, "normal": 1, "low": 2}
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted or runs out of time.
+
+    Args:
+        status_code (int): HTTP status code to be returned to the client.
+        detail (str): Reason of the rejection.
+        retry_after (float): Suggested number of seconds before retrying.
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+def ensure_time_left(deadline: float) -> None:
+    """Raise AdmissionRejected if the given deadline has already passed.
+
+    Args:
+        deadline (float): Absolute deadline in time.monotonic() seconds.
+
+    Raises:
+        AdmissionRejected: If the deadline has passed.
+    """
+    if time.monotonic() >= deadline:
+        raise AdmissionRejected(503, "Request deadline is exceeded.", 0.0)
+
+
+class AdmissionController:
+    """Bounded, priority-aware admission queue in front of the QA pipeline.
+
+    At most max_concurrency requests run retrieval and inference at the same
+    time and at most max_queue_size requests wait for a slot. Waiting requests
+    are served by priority class first and arrival order second. The service
+    time is estimated with an exponentially weighted moving average of the
+    completed requests, so that requests that cannot finish before their
+    deadline are rejected early instead of occupying the queue.
+
+    The controller is meant to be used from the event loop, so that waiting
+    requests do not occupy worker threads.
+
+    Args:
+        max_concurrency (int): Number of requests processed concurrently.
+        max_queue_size (int): Number of requests allowed to wait for a slot.
+        initial_service_time (float): Initial estimate of the service time
+            of a single request in seconds.
+        ewma_alpha (float): Smoothing factor of the service time estimate.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        max_queue_size: int,
+        initial_service_time: float = 0.5,
+        ewma_alpha: float = 0.2,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must be non-negative.")
+
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.ewma_alpha = ewma_alpha
+        self.service_time = initial_service_time
+
+        self._active = 0
+        self._waiting: List[Tuple[int, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    def expected_wait(self, priority: int) -> float:
+        """Estimate the queueing delay of a new request in seconds.
+
+        Args:
+            priority (int): Priority of the request, lower is more urgent.
+
+        Returns:
+            float: Expected time until the request obtains a slot.
+        """
+        ahead = sum(1 for item in self._waiting if item[0] <= priority)
+        if ahead == 0 and self._active < self.max_concurrency:
+            return 0.0
+        # All slots are busy: the request starts after (ahead + 1) releases,
+        # which happen at a rate of max_concurrency / service_time.
+        return (ahead + 1) * self.service_time / self.max_concurrency
+
+    @asynccontextmanager
+    async def admit(
+        self, deadline: float, priority: int = 1
+    ) -> AsyncIterator[None]:
+        """Hold a processing slot for the duration of the context.
+
+        Only requests that complete the context update the service time
+        estimate, so that requests aborted by their deadline do not lower it.
+
+        Args:
+            deadline (float): Absolute deadline in time.monotonic() seconds.
+            priority (int): Priority of the request, lower is more urgent.
+
+        Raises:
+            AdmissionRejected: With status code 429 if the queue is full and
+                503 if the request cannot be completed before its deadline.
+        """
+        await self._acquire(deadline, priority)
+        start = time.monotonic()
+        completed = False
+        try:
+            yield
+            completed = True
+        finally:
+            self._release(time.monotonic() - start if completed else None)
+
+    async def _acquire(self, deadline: float, priority: int) -> None:
+        wait = self.expected_wait(priority)
+        if wait > 0 and len(self._waiting) >= self.max_queue_size:
+            raise AdmissionRejected(429, "Admission queue is full.", wait)
+        if wait + self.service_time > deadline - time.monotonic():
+            raise AdmissionRejected(
+                503,
+                "Expected completion time exceeds the request deadline.",
+                wait,
+            )
+        if wait == 0:
+            self._active += 1
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (priority, next(self._counter), future)
+        heapq.heappush(self._waiting, entry)
+        # Latest start time that still allows to complete before the deadline
+        timeout = deadline - self.service_time - time.monotonic()
+        try:
+            await asyncio.wait_for(future, max(timeout, 0))
+        except asyncio.TimeoutError:
+            self._remove(entry)
+            raise AdmissionRejected(
+                503,
+                "Request deadline is exceeded while waiting.",
+                self.expected_wait(priority),
+            )
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the cancellation
+            if future.done() and not future.cancelled():
+                self._release(None)
+            else:
+                self._remove(entry)
+            raise
+
+    def _remove(self, entry: Tuple[int, int, asyncio.Future]) -> None:
+        if entry in self._waiting:
+            self._waiting.remove(entry)
+            heapq.heapify(self._waiting)
+
+    def _release(self, elapsed: Optional[float]) -> None:
+        if elapsed is not None:
+            self.service_time = (
+                self.ewma_alpha * elapsed
+                + (1 - self.ewma_alpha) * self.service_time
+            )
+        # The slot is handed over to the next waiting request, if any
+        while self._waiting:
+            _, _, future = heapq.heappop(self._waiting)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
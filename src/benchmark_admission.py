@@ -0,0 +1,196 @@
+"""Overload benchmark for the admission control of the QA application."""
+import argparse
+import asyncio
+import logging
+import random
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List
+
+from src.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    ensure_time_left,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmarking the admission control under overload."
+    )
+    parser.add_argument(
+        "--num_requests",
+        type=int,
+        default=400,
+        help="Number of requests to be sent.",
+    )
+    parser.add_argument(
+        "--service_time",
+        type=float,
+        default=0.05,
+        help="Mean service time of a single request in seconds, simulating "
+        "retrieval and inference.",
+    )
+    parser.add_argument(
+        "--retrieval_share",
+        type=float,
+        default=0.3,
+        help="Share of the service time spent on retrieval, after which the "
+        "deadline is checked before inference as in the application.",
+    )
+    parser.add_argument(
+        "--load_factor",
+        type=float,
+        default=2.0,
+        help="Offered load relative to the capacity of the service.",
+    )
+    parser.add_argument(
+        "--max_concurrency",
+        type=int,
+        default=2,
+        help="Number of requests processed concurrently.",
+    )
+    parser.add_argument(
+        "--max_queue_size",
+        type=int,
+        default=16,
+        help="Number of requests allowed to wait for a slot.",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=0.5,
+        help="Time budget of a single request in seconds.",
+    )
+    return parser.parse_args()
+
+
+async def run_load(
+    controller: AdmissionController,
+    num_requests: int,
+    service_time: float,
+    retrieval_share: float,
+    arrival_rate: float,
+    deadline: float,
+) -> Dict[str, List[float]]:
+    """Send requests with Poisson arrivals and record the outcomes.
+
+    Args:
+        controller (AdmissionController): Controller in front of the service.
+        num_requests (int): Number of requests to be sent.
+        service_time (float): Mean service time of a single request.
+        retrieval_share (float): Share of the service time spent on
+            retrieval.
+        arrival_rate (float): Mean number of arriving requests per second.
+        deadline (float): Time budget of a single request in seconds.
+
+    Returns:
+        Dict[str, List[float]]: Latencies of the completed requests, status
+        codes of the rejected requests and latencies of the requests aborted
+        after retrieval due to their deadline.
+    """
+    rng = random.Random(42)
+    outcomes = {"latencies": [], "rejections": [], "aborted": []}
+
+    async def handle(work: float) -> None:
+        start = time.monotonic()
+        try:
+            async with controller.admit(deadline=start + deadline):
+                await asyncio.sleep(work * retrieval_share)
+                try:
+                    ensure_time_left(start + deadline)
+                except AdmissionRejected:
+                    outcomes["aborted"].append(time.monotonic() - start)
+                    raise
+                await asyncio.sleep(work * (1 - retrieval_share))
+        except AdmissionRejected as e:
+            outcomes["rejections"].append(e.status_code)
+            return
+        outcomes["latencies"].append(time.monotonic() - start)
+
+    tasks = []
+    for _ in range(num_requests):
+        work = rng.expovariate(1 / service_time)
+        tasks.append(asyncio.create_task(handle(work)))
+        await asyncio.sleep(rng.expovariate(arrival_rate))
+
+    await asyncio.gather(*tasks)
+    return outcomes
+
+
+def report(
+    name: str, outcomes: Dict[str, List[float]], deadline: float
+) -> None:
+    """Log latency percentiles, rejection counts and deadline misses of a
+    benchmark run."""
+    latencies = sorted(outcomes["latencies"])
+    # Rejections after retrieval are reported separately as aborted
+    rejections = Counter(outcomes["rejections"])
+    rejections[503] -= len(outcomes["aborted"])
+    summary = (
+        f"{name}: completed {len(latencies)}, "
+        f"rejected {dict(+rejections)}, "
+        f"aborted after retrieval {len(outcomes['aborted'])}, "
+        f"completed after deadline "
+        f"{sum(latency > deadline for latency in latencies)}"
+    )
+    # Percentiles require at least two accepted requests
+    if len(latencies) >= 2:
+        percentiles = statistics.quantiles(
+            latencies, n=100, method="inclusive"
+        )
+        summary += (
+            f", p50 {percentiles[49] * 1000:.0f} ms, "
+            f"p99 {percentiles[98] * 1000:.0f} ms"
+        )
+    if latencies:
+        summary += f", max {latencies[-1] * 1000:.0f} ms"
+    logging.info(summary)
+
+
+def main():
+    args = parse_arguments()
+    arrival_rate = (
+        args.load_factor * args.max_concurrency / args.service_time
+    )
+
+    # Unbounded queue without deadlines, as in the plain threadpool
+    unbounded = asyncio.run(
+        run_load(
+            AdmissionController(
+                args.max_concurrency,
+                args.num_requests,
+                initial_service_time=args.service_time,
+            ),
+            args.num_requests,
+            args.service_time,
+            args.retrieval_share,
+            arrival_rate,
+            deadline=3600.0,
+        )
+    )
+    report("Unbounded queue", unbounded, args.deadline)
+
+    admitted = asyncio.run(
+        run_load(
+            AdmissionController(
+                args.max_concurrency,
+                args.max_queue_size,
+                initial_service_time=args.service_time,
+            ),
+            args.num_requests,
+            args.service_time,
+            args.retrieval_share,
+            arrival_rate,
+            deadline=args.deadline,
+        )
+    )
+    report("Admission control", admitted, args.deadline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Latency and throughput benchmark of the reader on CPU."""
+import argparse
+import logging
+import os
+import statistics
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+import torch
+from datasets import Dataset, load_dataset
+from transformers import pipeline
+
+from src.engine import (
+    DEFAULT_SHAPE_BUCKETS,
+    GRAPH_MODES,
+    TorchCPUEngine,
+    configure_threads,
+    parse_int_list,
+)
+from src.metrics import StreamingSquad
+
+logger = logging.getLogger(__name__)
+
+
+def parse_arguments():
+    """Parse arguments."""
+    parser = argparse.ArgumentParser(
+        description="Benchmarking the reader with different CPU settings."
+    )
+    parser.add_argument(
+        "--dataset_path",
+        type=str,
+        required=True,
+        help="Path of the validation set to be used for the benchmark.",
+    )
+    parser.add_argument(
+        "--val_set_size",
+        type=int,
+        default=200,
+        help="Size of the fixed validation slice.",
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        default="distilbert-base-uncased-distilled-squad",
+        help="Name of the pretrained model to be used for the reader.",
+    )
+    parser.add_argument(
+        "--intra_op_threads",
+        type=int,
+        nargs="+",
+        default=[0],
+        help="Numbers of intra-op threads to be benchmarked, 0 for the torch "
+        "default.",
+    )
+    parser.add_argument(
+        "--inter_op_threads",
+        type=int,
+        default=0,
+        help="Number of inter-op threads, 0 for the torch default. Can only "
+        "be set once per process, so each value needs a separate run.",
+    )
+    parser.add_argument(
+        "--cpu_affinity",
+        type=str,
+        default="",
+        help="Cores to pin the benchmark to such as 0-3, empty for no "
+        "pinning. The first max(--intra_op_threads) cores are used, so each "
+        "pinning needs a separate run.",
+    )
+    parser.add_argument(
+        "--graph",
+        type=str,
+        default="none",
+        choices=GRAPH_MODES,
+        help="Graph mode to be benchmarked with and without quantization. "
+        "Graph modes cannot be mixed in a process in torch 2.0, so each "
+        "graph mode needs a separate run.",
+    )
+    parser.add_argument(
+        "--shape_buckets",
+        type=str,
+        default=",".join(map(str, DEFAULT_SHAPE_BUCKETS)),
+        help="Sequence lengths the graphs are built for.",
+    )
+    parser.add_argument(
+        "--warmup_steps",
+        type=int,
+        default=5,
+        help="Number of examples run before the measurement.",
+    )
+    args = parser.parse_args()
+
+    # Sanity checks
+    if not os.path.exists(args.dataset_path):
+        raise ValueError("Given path does not exist.")
+
+    return args
+
+
+def run_setting(
+    question_answerer: Callable[..., Dict[str, Any]],
+    dataset: Dataset,
+    warmup_steps: int,
+) -> Tuple[List[float], float, List[str]]:
+    """Run the reader on the dataset after warming it up.
+
+    Args:
+        question_answerer (Callable[..., Dict[str, Any]]): Reader pipeline.
+        dataset (Dataset): Fixed validation slice.
+        warmup_steps (int): Number of examples run before the measurement.
+
+    Returns:
+        Tuple[List[float], float, List[str]]: Per-example latencies, total
+        time and predicted answers.
+    """
+    for example in dataset.select(range(min(warmup_steps, len(dataset)))):
+        question_answerer(
+            question=example["question"], context=example["context"]
+        )
+
+    latencies, predictions = [], []
+    start = time.perf_counter()
+    for example in dataset:
+        example_start = time.perf_counter()
+        prediction = question_answerer(
+            question=example["question"], context=example["context"]
+        )
+        latencies.append(time.perf_counter() - example_start)
+        predictions.append(prediction["answer"])
+    return latencies, time.perf_counter() - start, predictions
+
+
+def main():
+    args = parse_arguments()
+    default_threads = torch.get_num_threads()
+    configure_threads(
+        max(args.intra_op_threads), args.inter_op_threads, args.cpu_affinity
+    )
+
+    dataset = load_dataset("json", data_files=args.dataset_path, split="train")
+    dataset = dataset.shuffle(seed=42)
+    dataset = dataset.select(range(min(args.val_set_size, len(dataset))))
+    logging.info(f"Length of the dataset: {len(dataset)}")
+    if len(dataset) == 0:
+        raise ValueError("Validation slice is empty.")
+
+    # Baseline corresponds to the default pipeline without the engine
+    # Dynamically quantized models cannot be compiled
+    quantize_options = (False,) if args.graph == "compile" else (False, True)
+    settings = [("baseline", None, False)] + [
+        (f"graph={args.graph}, quantize={quantize}", args.graph, quantize)
+        for quantize in quantize_options
+    ]
+    baseline_predictions = None
+    for name, graph, quantize in settings:
+        torch.set_num_threads(max(args.intra_op_threads) or default_threads)
+        question_answerer = pipeline(
+            "question-answering", model=args.model_name, device=-1
+        )
+        if graph is not None:
+            question_answerer = TorchCPUEngine(
+                question_answerer,
+                graph=graph,
+                shape_buckets=parse_int_list(args.shape_buckets),
+                quantize=quantize,
+            )
+
+        for threads in args.intra_op_threads:
+            torch.set_num_threads(threads or default_threads)
+            latencies, total, predictions = run_setting(
+                question_answerer, dataset, args.warmup_steps
+            )
+            if baseline_predictions is None:
+                baseline_predictions = predictions
+
+            squad = StreamingSquad()
+            for prediction, example in zip(predictions, dataset):
+                squad.update(prediction, example["answers"]["text"])
+            metrics = squad.compute()
+            # Ratio of answers identical to the first baseline run
+            agreement = statistics.mean(
+                prediction == baseline_prediction
+                for prediction, baseline_prediction in zip(
+                    predictions, baseline_predictions
+                )
+            )
+            summary = (
+                f"{name}, threads={torch.get_num_threads()}: "
+                f"mean {statistics.mean(latencies) * 1000:.1f} ms, "
+            )
+            # Percentiles require at least two examples
+            if len(latencies) >= 2:
+                percentiles = statistics.quantiles(
+                    latencies, n=100, method="inclusive"
+                )
+                summary += (
+                    f"p50 {percentiles[49] * 1000:.1f} ms, "
+                    f"p99 {percentiles[98] * 1000:.1f} ms, "
+                )
+            logging.info(
+                summary
+                + f"throughput {len(latencies) / total:.2f} examples/s, "
+                f"F1 {metrics['f1']:.2f}, EM {metrics['exact_match']:.2f}, "
+                f"agreement with baseline {agreement:.2%}"
+            )
+
+
+if __name__ == "__main__":
+    main()
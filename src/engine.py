@@ -0,0 +1,357 @@
+"""Torch CPU inference engine for the reader model."""
+import configparser
+import fcntl
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence
+
+import torch
+import torch._dynamo
+import torch.nn.functional as F
+from transformers import Pipeline, pipeline
+
+logger = logging.getLogger(__name__)
+
+GRAPH_MODES = ("none", "compile", "torchscript")
+# Fine buckets, since padding to a coarse bucket costs more than the graph
+# optimization saves
+DEFAULT_SHAPE_BUCKETS = tuple(range(32, 385, 32))
+
+# Lock files of the claimed worker slots, kept open for the process lifetime
+_worker_locks: List[IO] = []
+
+
+def parse_int_list(text: str) -> List[int]:
+    """Parse a comma separated list of integers and ranges.
+
+    Args:
+        text (str): List such as "0-3,6".
+
+    Returns:
+        List[int]: Parsed integers such as [0, 1, 2, 3, 6].
+    """
+    values = []
+    for part in filter(None, (item.strip() for item in text.split(","))):
+        start, _, end = part.partition("-")
+        values.extend(range(int(start), int(end or start) + 1))
+    return values
+
+
+def claim_worker_index(lock_dir: str, num_slots: int) -> Optional[int]:
+    """Claim the lowest free worker slot by locking its lock file.
+
+    The lock is held until the process exits, so that concurrently started
+    worker processes obtain distinct slots and the slots of terminated
+    workers can be claimed again.
+
+    Args:
+        lock_dir (str): Directory of the lock files.
+        num_slots (int): Number of available slots.
+
+    Returns:
+        Optional[int]: Index of the claimed slot, None if all slots are taken.
+    """
+    Path(lock_dir).mkdir(parents=True, exist_ok=True)
+    for index in range(num_slots):
+        lock_file = open(Path(lock_dir) / f"worker_{index}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            continue
+        _worker_locks.append(lock_file)
+        return index
+    return None
+
+
+def configure_threads(
+    intra_op_threads: int,
+    inter_op_threads: int,
+    cpu_affinity: str,
+    worker_index: int = 0,
+) -> None:
+    """Set torch threading and pin the current process to its CPU cores.
+
+    The cores given by cpu_affinity are split into consecutive slices of
+    intra_op_threads cores and the worker with index worker_index is pinned
+    to its own slice, so that several workers do not compete for the same
+    cores. Must be called before any inference is run.
+
+    Args:
+        intra_op_threads (int): Number of intra-op threads, 0 for the torch
+            default.
+        inter_op_threads (int): Number of inter-op threads, 0 for the torch
+            default.
+        cpu_affinity (str): Cores available to the workers such as "0-7",
+            empty for no pinning.
+        worker_index (int): Index of the current worker process.
+
+    Raises:
+        ValueError: If cpu_affinity is given without intra_op_threads or does
+            not contain enough cores for the given worker.
+    """
+    if cpu_affinity:
+        if not intra_op_threads:
+            raise ValueError(
+                "intra_op_threads must be set to the number of cores per "
+                "worker when cpu_affinity is given."
+            )
+        cores = parse_int_list(cpu_affinity)
+        worker_cores = cores[
+            worker_index * intra_op_threads:
+            (worker_index + 1) * intra_op_threads
+        ]
+        if len(worker_cores) < intra_op_threads:
+            raise ValueError(
+                f"cpu_affinity {cpu_affinity} does not have "
+                f"{intra_op_threads} cores for worker {worker_index}."
+            )
+        os.sched_setaffinity(0, worker_cores)
+        logging.info(
+            f"Worker {worker_index} is pinned to cores {worker_cores}."
+        )
+
+    if intra_op_threads:
+        torch.set_num_threads(intra_op_threads)
+    if inter_op_threads:
+        torch.set_num_interop_threads(inter_op_threads)
+
+
+class _LogitsModule(torch.nn.Module):
+    """Return start and end logits as a tuple from positional inputs, which is
+    required for tracing and compiling."""
+
+    def __init__(self, model: torch.nn.Module, input_names: Sequence[str]):
+        super().__init__()
+        self.model = model
+        self.input_names = input_names
+
+    def forward(self, *inputs: torch.Tensor):
+        outputs = self.model(
+            **dict(zip(self.input_names, inputs)), return_dict=False
+        )
+        return outputs[0], outputs[1]
+
+
+class BucketedModel(torch.nn.Module):
+    """Question answering model with one optimized graph per input length.
+
+    Inputs are padded to the smallest shape bucket that fits them, so that
+    only a fixed set of shapes is traced or compiled, and the logits are
+    sliced back to the original length. Inputs longer than the largest bucket
+    are run by the eager model. Compiled graphs are run under torch.no_grad
+    instead of torch.inference_mode, since torch.compile fails on inference
+    tensors in torch 2.0.
+
+    Args:
+        model (torch.nn.Module): Question answering model.
+        input_names (Sequence[str]): Input names of the tokenizer.
+        shape_buckets (Sequence[int]): Sequence lengths to be optimized for.
+        graph (str): Either "compile" for torch.compile or "torchscript" for
+            TorchScript tracing.
+        pad_token_id (int): Id of the padding token.
+    """
+
+    def __init__(
+        self,
+        model: torch.nn.Module,
+        input_names: Sequence[str],
+        shape_buckets: Sequence[int],
+        graph: str,
+        pad_token_id: int,
+    ):
+        super().__init__()
+        self.config = model.config
+        self.input_names = list(input_names)
+        self.shape_buckets = sorted(shape_buckets)
+        self.pad_token_id = pad_token_id
+        self.logits_module = _LogitsModule(model, self.input_names)
+        self.graph = graph
+
+        if graph == "compile":
+            # Each bucket is a separate compilation, which must not exceed
+            # the recompilation limit to avoid falling back to eager mode
+            torch._dynamo.config.cache_size_limit = max(
+                torch._dynamo.config.cache_size_limit, len(self.shape_buckets)
+            )
+            compiled = torch.compile(self.logits_module, dynamic=False)
+            self.graphs = {bucket: compiled for bucket in self.shape_buckets}
+        else:
+            self.graphs = {}
+            for bucket in self.shape_buckets:
+                with torch.no_grad():
+                    traced = torch.jit.trace(
+                        self.logits_module,
+                        self._dummy_inputs(bucket),
+                        check_trace=False,
+                    )
+                self.graphs[bucket] = torch.jit.freeze(traced.eval())
+
+        # Graphs are compiled (or optimized by the TorchScript profiling
+        # executor) on their first runs, which is done here instead of on
+        # the first requests
+        for bucket in self.shape_buckets:
+            with torch.inference_mode():
+                for _ in range(2):
+                    self._run_graph(bucket, self._dummy_inputs(bucket))
+
+    def _dummy_inputs(self, length: int) -> List[torch.Tensor]:
+        return [
+            torch.full((1, length), self.pad_token_id, dtype=torch.long)
+            if name == "input_ids"
+            else torch.ones((1, length), dtype=torch.long)
+            for name in self.input_names
+        ]
+
+    def _run_graph(self, bucket: int, inputs: List[torch.Tensor]):
+        if self.graph != "compile":
+            return self.graphs[bucket](*inputs)
+        # Cloning outside of inference mode turns inference tensors into
+        # normal tensors
+        with torch.inference_mode(False), torch.no_grad():
+            return self.graphs[bucket](*[tensor.clone() for tensor in inputs])
+
+    def forward(self, **inputs: torch.Tensor):
+        length = inputs["input_ids"].shape[-1]
+        bucket = next((b for b in self.shape_buckets if b >= length), None)
+        if bucket is None:
+            return self.logits_module(
+                *[inputs[name] for name in self.input_names]
+            )
+
+        padded = [
+            F.pad(
+                inputs[name],
+                (0, bucket - length),
+                value=self.pad_token_id if name == "input_ids" else 0,
+            )
+            for name in self.input_names
+        ]
+        start, end = self._run_graph(bucket, padded)
+        return start[..., :length], end[..., :length]
+
+
+class TorchCPUEngine:
+    """Reader pipeline running on CPU under torch.inference_mode with optional
+    dynamic int8 quantization and graph optimization.
+
+    Args:
+        question_answerer (Pipeline): Question answering pipeline on CPU.
+        graph (str): One of GRAPH_MODES.
+        shape_buckets (Sequence[int]): Sequence lengths to be optimized for
+            if graph is not "none".
+        quantize (bool): Whether to apply dynamic int8 quantization to the
+            linear layers. Not supported together with graph "compile".
+    """
+
+    def __init__(
+        self,
+        question_answerer: Pipeline,
+        graph: str = "none",
+        shape_buckets: Sequence[int] = DEFAULT_SHAPE_BUCKETS,
+        quantize: bool = False,
+    ):
+        if graph not in GRAPH_MODES:
+            raise ValueError(
+                f"graph must be one of {GRAPH_MODES}, got {graph}."
+            )
+        if graph == "compile" and quantize:
+            raise ValueError(
+                "torch.compile does not support dynamically quantized models, "
+                "use graph torchscript or none with quantize."
+            )
+
+        model = question_answerer.model.eval()
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        if graph != "none":
+            model = BucketedModel(
+                model,
+                input_names=question_answerer.tokenizer.model_input_names,
+                shape_buckets=shape_buckets,
+                graph=graph,
+                pad_token_id=question_answerer.tokenizer.pad_token_id,
+            )
+        question_answerer.model = model
+        self.question_answerer = question_answerer
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+        with torch.inference_mode():
+            return self.question_answerer(*args, **kwargs)
+
+
+def get_question_answerer(
+    hparams_config: configparser.ConfigParser,
+) -> Callable[..., Dict[str, Any]]:
+    """Create the reader pipeline, using TorchCPUEngine configured by the
+    optional ENGINE section if no GPU is available.
+
+    Args:
+        hparams_config (configparser.ConfigParser): Hyperparameters config.
+
+    Returns:
+        Callable[..., Dict[str, Any]]: Question answering pipeline.
+    """
+    model_checkpoint = hparams_config["HYPERPARAMS"]["model_checkpoint"]
+    if torch.cuda.is_available():
+        return pipeline(
+            "question-answering",
+            model=model_checkpoint,
+            device=0,
+            load_in_8bit=True,
+        )
+
+    intra_op_threads = hparams_config.getint(
+        "ENGINE", "intra_op_threads", fallback=0
+    )
+    cpu_affinity = hparams_config.get("ENGINE", "cpu_affinity", fallback="")
+    worker_index = 0
+    if cpu_affinity and intra_op_threads:
+        if "QA_WORKER_INDEX" in os.environ:
+            worker_index = int(os.environ["QA_WORKER_INDEX"])
+        else:
+            # Each worker process claims its own slice of the cores
+            worker_index = claim_worker_index(
+                lock_dir=hparams_config.get(
+                    "ENGINE",
+                    "worker_lock_dir",
+                    fallback=os.path.join(
+                        tempfile.gettempdir(), "qa-pipeline-workers"
+                    ),
+                ),
+                num_slots=len(parse_int_list(cpu_affinity))
+                // intra_op_threads,
+            )
+            if worker_index is None:
+                logging.warning(
+                    "All core slices of cpu_affinity are claimed by other "
+                    "workers, the worker is not pinned."
+                )
+                cpu_affinity, worker_index = "", 0
+
+    configure_threads(
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=hparams_config.getint(
+            "ENGINE", "inter_op_threads", fallback=0
+        ),
+        cpu_affinity=cpu_affinity,
+        worker_index=worker_index,
+    )
+    return TorchCPUEngine(
+        pipeline("question-answering", model=model_checkpoint, device=-1),
+        graph=hparams_config.get("ENGINE", "graph", fallback="none"),
+        shape_buckets=parse_int_list(
+            hparams_config.get(
+                "ENGINE",
+                "shape_buckets",
+                fallback=",".join(map(str, DEFAULT_SHAPE_BUCKETS)),
+            )
+        ),
+        quantize=hparams_config.getboolean(
+            "ENGINE", "quantize", fallback=False
+        ),
+    )
@@ -1,22 +1,55 @@
 """Evaluation script for the QA pipeline."""
 import argparse
+import json
 import logging
 import os
+import time
 from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Optional
 
+import pyarrow as pa
+import pyarrow.parquet as pq
 import torch
-from datasets import load_dataset
+from datasets import Dataset, load_dataset
+from elasticsearch import Elasticsearch
 from evaluate import evaluator
+from transformers import Pipeline, pipeline
 
+from src.metrics import StreamingMRR, StreamingSquad
 from src.utils import (
     calculate_element_mrr,
+    calculate_reciprocal_rank,
     get_config,
     get_elastic_search_client,
+    get_hits,
     update_context,
 )
 
 logger = logging.getLogger(__name__)
 
+RESULTS_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("retrieved_ids", pa.list_(pa.string())),
+        ("mrr", pa.float64()),
+        ("prediction", pa.string()),
+        ("score", pa.float64()),
+        ("answers", pa.list_(pa.string())),
+        ("retrieval_time", pa.float64()),
+        ("reader_time", pa.float64()),
+    ]
+)
+RUN_CONFIG_KEYS = (
+    "pipeline",
+    "val_set_size",
+    "context_size",
+    "dataset_path",
+    "index_name",
+    "model_name",
+    "chunk_size",
+)
+
 
 def parse_arguments():
     """Parse arguments."""
@@ -24,10 +57,11 @@ def parse_arguments():
     parser.add_argument(
         "--pipeline",
         type=str,
-        required=True,
+        default=None,
         help="Selection of the pipeline part to be evalated. Retrieval "
         "corresonds to only retrieval, reader corresponds to only reader "
-        "and e2e corresponds to end-to-end pipeline.",
+        "and e2e corresponds to end-to-end pipeline. Required unless "
+        "--rescore is given.",
         choices=["retrieval", "reader", "e2e"],
     )
     parser.add_argument(
@@ -41,15 +75,15 @@ def parse_arguments():
         "--context_size",
         type=int,
         default=None,
-        required=True,
         help="Number of contexts (responses) to be retrieved given a question "
-        "(request).",
+        "(request). Required unless --rescore is given.",
     )
     parser.add_argument(
         "--dataset_path",
         type=str,
-        required=True,
-        help="Path of the validation set to be used for the evaluation.",
+        default=None,
+        help="Path of the validation set to be used for the evaluation. "
+        "Required unless --rescore is given.",
     )
     parser.add_argument(
         "--index_name",
@@ -63,19 +97,248 @@ def parse_arguments():
         default="distilbert-base-uncased-distilled-squad",
         help="Name of the pretrained model to be used for the pipeline.",
     )
+    parser.add_argument(
+        "--output_dir",
+        type=str,
+        default=None,
+        help="Directory for the per-example results. If given, the dataset is "
+        "processed in chunks, results are persisted as Parquet files after "
+        "each chunk and an interrupted run is resumed from the last "
+        "completed chunk.",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=1000,
+        help="Number of examples processed and persisted at once when "
+        "--output_dir is given.",
+    )
+    parser.add_argument(
+        "--rescore",
+        action="store_true",
+        help="Only compute the metrics from the results stored in "
+        "--output_dir, without running retrieval or the reader.",
+    )
     args = parser.parse_args()
 
     # Sanity checks
-    if not os.path.exists(args.dataset_path):
+    if args.rescore:
+        if args.output_dir is None:
+            raise ValueError("--output_dir is required for --rescore.")
+        return args
+    if args.pipeline is None:
+        raise ValueError("--pipeline is required.")
+    if args.context_size is None:
+        raise ValueError("--context_size is required.")
+    if args.dataset_path is None or not os.path.exists(args.dataset_path):
         raise ValueError("Given path does not exist.")
+    if args.chunk_size < 1:
+        raise ValueError("--chunk_size must be positive.")
 
     return args
 
 
+def evaluate_example(
+    example: Dict[str, Any],
+    pipeline_name: str,
+    index_name: str,
+    size: int,
+    es: Elasticsearch,
+    question_answerer: Optional[Pipeline],
+) -> Dict[str, Any]:
+    """Run the selected pipeline part on a single data instance.
+
+    Args:
+        example (Dict[str, Any]): Single data instance.
+        pipeline_name (str): Pipeline part to be evaluated.
+        index_name (str): Name of the index for retrieving the data.
+        size (int): Number of returned contexts (responses).
+        es (Elasticsearch): Elasticsearch client instance.
+        question_answerer (Optional[Pipeline]): Reader pipeline, None for
+            only retrieval.
+
+    Returns:
+        Dict[str, Any]: Per-example result following RESULTS_SCHEMA.
+    """
+    result = {
+        "id": example["id"],
+        "retrieved_ids": [],
+        "mrr": None,
+        "prediction": None,
+        "score": None,
+        "answers": example["answers"]["text"],
+        "retrieval_time": None,
+        "reader_time": None,
+    }
+    context = example["context"]
+
+    if pipeline_name in ("retrieval", "e2e"):
+        start = time.perf_counter()
+        hits = get_hits(example["question"], index_name, size, es)
+        result["retrieval_time"] = time.perf_counter() - start
+
+        contexts = [hit["context"] for hit in hits]
+        result["retrieved_ids"] = [hit["id"] for hit in hits]
+        result["mrr"] = calculate_reciprocal_rank(context, contexts)
+        context = " ".join(contexts)
+
+    if pipeline_name in ("reader", "e2e"):
+        start = time.perf_counter()
+        # For the cases that Elasticsearch returns null
+        if context:
+            prediction = question_answerer(
+                question=example["question"], context=context
+            )
+        else:
+            prediction = {"answer": "", "score": 0.0}
+        result["reader_time"] = time.perf_counter() - start
+        result["prediction"] = prediction["answer"]
+        result["score"] = prediction["score"]
+
+    return result
+
+
+def evaluate_in_chunks(
+    dataset: Dataset,
+    args: argparse.Namespace,
+    es: Elasticsearch,
+    question_answerer: Optional[Pipeline],
+) -> None:
+    """Evaluate the dataset chunk by chunk and persist the per-example results
+    of each chunk as a Parquet file within args.output_dir.
+
+    Chunks with an existing result file are skipped, so that an interrupted
+    run is resumed from the last completed chunk.
+
+    Args:
+        dataset (Dataset): Dataset to be evaluated.
+        args (argparse.Namespace): Arguments of the evaluation.
+        es (Elasticsearch): Elasticsearch client instance.
+        question_answerer (Optional[Pipeline]): Reader pipeline, None for
+            only retrieval.
+
+    Raises:
+        ValueError: If args.output_dir contains results of a run with
+            different arguments or a different dataset.
+    """
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    num_chunks = -(-len(dataset) // args.chunk_size)
+    run_config = {key: getattr(args, key) for key in RUN_CONFIG_KEYS}
+    # Expected totals, so that rescoring can detect an incomplete run
+    run_config["num_examples"] = len(dataset)
+    run_config["num_chunks"] = num_chunks
+    run_config_path = output_dir / "run_config.json"
+    if run_config_path.exists():
+        with open(run_config_path) as file:
+            if json.load(file) != run_config:
+                raise ValueError(
+                    f"{output_dir} contains results of a run with different "
+                    "arguments."
+                )
+    else:
+        with open(run_config_path, "w") as file:
+            json.dump(run_config, file, indent=4)
+
+    for chunk_index in range(num_chunks):
+        chunk_path = output_dir / f"chunk_{chunk_index:05d}.parquet"
+        if chunk_path.exists():
+            logging.info(f"Chunk {chunk_index} is already completed.")
+            continue
+
+        start = chunk_index * args.chunk_size
+        end = min(start + args.chunk_size, len(dataset))
+        results = [
+            evaluate_example(
+                example,
+                pipeline_name=args.pipeline,
+                index_name=args.index_name,
+                size=args.context_size,
+                es=es,
+                question_answerer=question_answerer,
+            )
+            for example in dataset.select(range(start, end))
+        ]
+
+        # Written to a temporary file first, so that an interrupted write
+        # never leaves a partial chunk behind
+        tmp_path = chunk_path.with_suffix(".tmp")
+        pq.write_table(
+            pa.Table.from_pylist(results, schema=RESULTS_SCHEMA), tmp_path
+        )
+        os.replace(tmp_path, chunk_path)
+        logging.info(f"Chunk {chunk_index + 1}/{num_chunks} is completed.")
+
+
+def rescore_results(output_dir: str) -> Dict[str, float]:
+    """Compute the metrics from the persisted per-example results.
+
+    Args:
+        output_dir (str): Directory of the per-example results.
+
+    Returns:
+        Dict[str, float]: Number of scored examples, MRR related metrics if
+        retrieval results exist, F1 and exact match if reader results exist,
+        and mean timings.
+    """
+    mrr, squad = StreamingMRR(), StreamingSquad()
+    timings = {"retrieval_time": [0.0, 0], "reader_time": [0.0, 0]}
+    num_examples = 0
+
+    chunk_paths = sorted(Path(output_dir).glob("chunk_*.parquet"))
+    run_config_path = Path(output_dir) / "run_config.json"
+    if run_config_path.exists():
+        with open(run_config_path) as file:
+            run_config = json.load(file)
+        logging.info(
+            f"Rescoring {run_config['pipeline']} results of "
+            f"{len(chunk_paths)}/{run_config['num_chunks']} chunks."
+        )
+        if len(chunk_paths) < run_config["num_chunks"]:
+            logging.warning(
+                f"{run_config['num_chunks'] - len(chunk_paths)} chunks are "
+                "missing, the metrics correspond to an incomplete run. Rerun "
+                "the evaluation with the same arguments to resume it."
+            )
+    else:
+        logging.warning(
+            f"{run_config_path} does not exist, completeness of the "
+            f"{len(chunk_paths)} chunks cannot be verified."
+        )
+
+    for chunk_path in chunk_paths:
+        for batch in pq.ParquetFile(chunk_path).iter_batches():
+            for result in batch.to_pylist():
+                num_examples += 1
+                if result["mrr"] is not None:
+                    mrr.update(result["mrr"])
+                if result["prediction"] is not None:
+                    squad.update(result["prediction"], result["answers"])
+                for key, timing in timings.items():
+                    if result[key] is not None:
+                        timing[0] += result[key]
+                        timing[1] += 1
+
+    metrics = {
+        "num_examples": num_examples,
+        **mrr.compute(),
+        **squad.compute(),
+    }
+    for key, (total, count) in timings.items():
+        if count:
+            metrics[f"mean_{key}"] = total / count
+    return metrics
+
+
 def main():
     args = parse_arguments()
     logging.info("Arguments are obtained.")
 
+    if args.rescore:
+        logging.info(rescore_results(args.output_dir))
+        return
+
     dataset = load_dataset("json", data_files=args.dataset_path, split="train")
     dataset = dataset.shuffle(seed=42)
     logging.info("Data is loaded and shuffled.")
@@ -98,6 +361,20 @@ def main():
     )
     logging.info("Elastic search connection is created.")
 
+    if args.output_dir is not None:
+        question_answerer = (
+            pipeline(
+                "question-answering",
+                model=args.model_name,
+                device=0 if torch.cuda.is_available() else -1,
+            )
+            if args.pipeline in ("reader", "e2e")
+            else None
+        )
+        evaluate_in_chunks(dataset, args, es, question_answerer)
+        logging.info(rescore_results(args.output_dir))
+        return
+
     match args.pipeline:
         case "retrieval":
             dataset = dataset.map(
@@ -1,11 +1,20 @@
 """Main script for the QA application."""
 import logging
-
-import torch
-from fastapi import FastAPI
-from pydantic import BaseModel
-from transformers import pipeline
-
+import time
+from typing import Literal, Optional
+
+from anyio.to_thread import current_default_thread_limiter
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+
+from src.admission import (
+    PRIORITY_CLASSES,
+    AdmissionController,
+    AdmissionRejected,
+    ensure_time_left,
+)
+from src.engine import get_question_answerer
 from src.utils import get_config, get_context, get_elastic_search_client
 
 logger = logging.getLogger(__name__)
@@ -21,22 +30,46 @@ es = get_elastic_search_client(
 
 app = FastAPI()
 
-question_answerer = pipeline(
-    "question-answering",
-    model=hparams_config["HYPERPARAMS"]["model_checkpoint"],
-    device=0 if torch.cuda.is_available() else -1,
-    load_in_8bit=True,
+question_answerer = get_question_answerer(hparams_config)
+
+admission_controller = AdmissionController(
+    max_concurrency=hparams_config.getint(
+        "ADMISSION", "max_concurrency", fallback=2
+    ),
+    max_queue_size=hparams_config.getint(
+        "ADMISSION", "max_queue_size", fallback=16
+    ),
+)
+default_deadline = hparams_config.getfloat(
+    "ADMISSION", "default_deadline", fallback=5.0
+)
+max_deadline = hparams_config.getfloat(
+    "ADMISSION", "max_deadline", fallback=30.0
 )
 
 
 class QuestionRequest(BaseModel):
     text: str
+    # Time budget of the request in seconds, configured default if not given
+    deadline: Optional[float] = Field(default=None, gt=0)
+    priority: Literal["high", "normal", "low"] = "normal"
 
 
 class Response(BaseModel):
     text: str
 
 
+@app.on_event("startup")
+async def app_startup():
+    # Admitted requests run in the threadpool, which must not queue them
+    thread_limit = current_default_thread_limiter().total_tokens
+    if admission_controller.max_concurrency > thread_limit:
+        raise ValueError(
+            f"max_concurrency ({admission_controller.max_concurrency}) "
+            f"exceeds the threadpool size ({thread_limit})."
+        )
+
+
 @app.on_event("shutdown")
 def app_shutdown():
     es.close()
@@ -50,11 +83,34 @@ def root():
 
 
 @app.post("/extract")
-def extract(body: QuestionRequest):
+async def extract(body: QuestionRequest):
+    # The deadline starts at arrival and requests wait for a slot on the
+    # event loop, so that only admitted requests occupy worker threads
+    deadline = time.monotonic() + min(
+        body.deadline or default_deadline, max_deadline
+    )
+    try:
+        async with admission_controller.admit(
+            deadline=deadline, priority=PRIORITY_CLASSES[body.priority]
+        ):
+            text = await run_in_threadpool(
+                answer_question, body.text, deadline
+            )
+    except AdmissionRejected as e:
+        logger.warning(f"Request is rejected: {e.detail}")
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
+    return Response(text=text)
+
+
+def answer_question(question: str, deadline: float) -> str:
     # context is to be extracted from ES
     concat_context = " ".join(
         get_context(
-            question=body.text,
+            question=question,
             index_name=hparams_config["HYPERPARAMS"]["index_name"],
             size=hparams_config["HYPERPARAMS"]["context_size"],
             es=es,
@@ -62,14 +118,15 @@ def extract(body: QuestionRequest):
     )
     # For the cases that Elasticsearch returns null
     if not concat_context:
-        text = "Answer is not found."
-    else:
-        result = question_answerer(question=body.text, context=concat_context)
-
-        text = (
-            result["answer"]
-            if result["score"]
-            > float(hparams_config["HYPERPARAMS"]["qa_threshold"])
-            else "Answer is not found."
-        )
-    return Response(text=text)
+        return "Answer is not found."
+
+    # Inference is skipped if retrieval has already used up the time budget
+    ensure_time_left(deadline)
+    result = question_answerer(question=question, context=concat_context)
+
+    return (
+        result["answer"]
+        if result["score"]
+        > float(hparams_config["HYPERPARAMS"]["qa_threshold"])
+        else "Answer is not found."
+    )
@@ -0,0 +1,117 @@
+"""Streaming metric aggregators for the evaluation of the QA pipeline."""
+import re
+import string
+from collections import Counter
+from typing import Dict, List, Optional
+
+PUNCTUATION = set(string.punctuation)
+
+
+def normalize_answer(text: str) -> str:
+    """Lower text and remove punctuation, articles and extra whitespace, as in
+    the official SQuAD evaluation script.
+
+    Args:
+        text (str): Answer text to be normalized.
+
+    Returns:
+        str: Normalized answer text.
+    """
+    text = text.lower()
+    text = "".join(ch for ch in text if ch not in PUNCTUATION)
+    text = re.sub(r"\b(a|an|the)\b", " ", text)
+    return " ".join(text.split())
+
+
+def calculate_f1(prediction: str, ground_truth: str) -> float:
+    """Calculate token level F1 between a prediction and a ground truth.
+
+    Args:
+        prediction (str): Predicted answer.
+        ground_truth (str): Ground truth answer.
+
+    Returns:
+        float: F1 score between 0 and 1.
+    """
+    prediction_tokens = normalize_answer(prediction).split()
+    ground_truth_tokens = normalize_answer(ground_truth).split()
+    num_same = sum(
+        (Counter(prediction_tokens) & Counter(ground_truth_tokens)).values()
+    )
+    if num_same == 0:
+        return 0.0
+    precision = num_same / len(prediction_tokens)
+    recall = num_same / len(ground_truth_tokens)
+    return 2 * precision * recall / (precision + recall)
+
+
+def calculate_exact_match(prediction: str, ground_truth: str) -> float:
+    """Calculate exact match between a prediction and a ground truth.
+
+    Args:
+        prediction (str): Predicted answer.
+        ground_truth (str): Ground truth answer.
+
+    Returns:
+        float: 1.0 if normalized answers are equal, 0.0 otherwise.
+    """
+    return float(
+        normalize_answer(prediction) == normalize_answer(ground_truth)
+    )
+
+
+class StreamingMRR:
+    """Aggregate MRR (Mean Reciprocal Rank) one example at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.first = 0
+        self.uncaptured = 0
+
+    def update(self, mrr: float) -> None:
+        self.count += 1
+        self.total += mrr
+        self.first += mrr == 1
+        self.uncaptured += mrr == 0
+
+    def compute(self) -> Dict[str, float]:
+        """Return MRR, ratio of true first response and ratio of uncaptured
+        true answer."""
+        if self.count == 0:
+            return {}
+        return {
+            "mrr": self.total / self.count,
+            "true_first_response_ratio": self.first / self.count,
+            "uncaptured_true_answer_ratio": self.uncaptured / self.count,
+        }
+
+
+class StreamingSquad:
+    """Aggregate SQuAD F1 and exact match one example at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.f1 = 0.0
+        self.exact_match = 0.0
+
+    def update(self, prediction: Optional[str], answers: List[str]) -> None:
+        prediction = prediction or ""
+        self.count += 1
+        self.f1 += max(
+            (calculate_f1(prediction, answer) for answer in answers),
+            default=0.0,
+        )
+        self.exact_match += max(
+            (calculate_exact_match(prediction, answer) for answer in answers),
+            default=0.0,
+        )
+
+    def compute(self) -> Dict[str, float]:
+        """Return F1 and exact match in percentages."""
+        if self.count == 0:
+            return {}
+        return {
+            "f1": 100 * self.f1 / self.count,
+            "exact_match": 100 * self.exact_match / self.count,
+        }
@@ -80,12 +80,33 @@ def get_context(
     Returns:
         List[str]: List of contexts (responses) for a given question (query).
     """
+    return [hit["context"] for hit in get_hits(question, index_name, size, es)]
+
+
+def get_hits(
+    question: str, index_name: str, size: int, es: Elasticsearch
+) -> List[Dict[str, str]]:
+    """Retrieve the ids and contexts of the most relevant documents given a
+    question from Elasticsearch cluster.
+
+    Args:
+        question (str): Question that used as the query.
+        index_name (str): Name of the index for retrieving the data.
+        size (int): Number of returned questions (responses).
+        es (Elasticsearch): Elasticsearch client instance.
+
+    Returns:
+        List[Dict[str, str]]: List of hits with "id" and "context" keys.
+    """
     results = es.search(
         index=index_name,
         body={"query": {"match": {"context": question}}},
         size=size,
     )
-    return [item["_source"]["context"] for item in results["hits"]["hits"]]
+    return [
+        {"id": item["_id"], "context": item["_source"]["context"]}
+        for item in results["hits"]["hits"]
+    ]
 
 
 def update_context(
@@ -108,6 +129,24 @@ def update_context(
     return example
 
 
+def calculate_reciprocal_rank(
+    context: str, retrieved_contexts: List[str]
+) -> float:
+    """Calculate reciprocal rank of the correct context among the retrieved
+    contexts.
+
+    Args:
+        context (str): Correct context of the question.
+        retrieved_contexts (List[str]): Retrieved contexts in ranked order.
+
+    Returns:
+        float: Reciprocal rank, 0 if the correct context is not retrieved.
+    """
+    if context not in retrieved_contexts:
+        return 0.0
+    return 1 / (retrieved_contexts.index(context) + 1)
+
+
 def calculate_element_mrr(
     example: Dict[str, Any], index_name: str, size: int, es: Elasticsearch
 ) -> Dict[str, Any]:
@@ -122,11 +161,9 @@ def calculate_element_mrr(
     Returns:
         Dict[str, Any]: Single data instance with added MRR value.
     """
-    concat_context = get_context(example["question"], index_name, size, es)
-    example["mrr"] = (
-        1 / (concat_context.index(example["context"]) + 1)
-        if example["context"] in concat_context
-        else 0
+    example["mrr"] = calculate_reciprocal_rank(
+        example["context"],
+        get_context(example["question"], index_name, size, es),
     )
     return example
 
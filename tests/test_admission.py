@@ -0,0 +1,146 @@
+import asyncio
+import time
+import unittest
+
+from src.admission import (
+    AdmissionController,
+    AdmissionRejected,
+    ensure_time_left,
+)
+
+
+class TestEnsureTimeLeft(unittest.TestCase):
+    def test_ensure_time_left_before_deadline(self):
+        ensure_time_left(time.monotonic() + 10)
+
+    def test_ensure_time_left_after_deadline(self):
+        # Assert that 503 is raised once the deadline has passed
+        with self.assertRaises(AdmissionRejected) as cm:
+            ensure_time_left(time.monotonic() - 1)
+        self.assertEqual(cm.exception.status_code, 503)
+
+
+class TestAdmissionController(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.controller = AdmissionController(
+            max_concurrency=1, max_queue_size=1, initial_service_time=1.0
+        )
+
+    async def hold_slot(self, controller, started, release, priority=1):
+        async with controller.admit(
+            deadline=time.monotonic() + 10, priority=priority
+        ):
+            started.set()
+            await release.wait()
+
+    async def wait_for_queue(self, controller, length):
+        while len(controller._waiting) < length:
+            await asyncio.sleep(0.01)
+
+    async def test_admit_with_free_slot(self):
+        self.assertEqual(self.controller.expected_wait(priority=1), 0.0)
+        async with self.controller.admit(deadline=time.monotonic() + 2):
+            self.assertEqual(self.controller.expected_wait(priority=1), 1.0)
+
+    async def test_admit_rejects_when_service_time_exceeds_deadline(self):
+        # Assert early rejection even with a free slot, since the request
+        # cannot complete before its deadline
+        with self.assertRaises(AdmissionRejected) as cm:
+            async with self.controller.admit(deadline=time.monotonic() + 0.5):
+                pass
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(self.controller._active, 0)
+
+    async def test_admit_rejects_when_deadline_is_too_short(self):
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(
+            self.hold_slot(self.controller, started, release)
+        )
+        await started.wait()
+        # Assert early rejection when the expected wait and service time
+        # exceed the deadline
+        with self.assertRaises(AdmissionRejected) as cm:
+            async with self.controller.admit(deadline=time.monotonic() + 1.5):
+                pass
+        self.assertEqual(cm.exception.status_code, 503)
+        release.set()
+        await holder
+
+    async def test_admit_rejects_when_queue_is_full(self):
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(
+            self.hold_slot(self.controller, started, release)
+        )
+        await started.wait()
+        waiter = asyncio.create_task(
+            self.hold_slot(self.controller, asyncio.Event(), release)
+        )
+        await self.wait_for_queue(self.controller, 1)
+        # Assert that 429 is raised when no more requests can wait
+        with self.assertRaises(AdmissionRejected) as cm:
+            async with self.controller.admit(deadline=time.monotonic() + 10):
+                pass
+        self.assertEqual(cm.exception.status_code, 429)
+        release.set()
+        await asyncio.gather(holder, waiter)
+        self.assertEqual(self.controller._active, 0)
+
+    async def test_admit_rejects_when_deadline_passes_while_waiting(self):
+        controller = AdmissionController(
+            max_concurrency=1, max_queue_size=1, initial_service_time=0.01
+        )
+        started, release = asyncio.Event(), asyncio.Event()
+        holder = asyncio.create_task(
+            self.hold_slot(controller, started, release)
+        )
+        await started.wait()
+        with self.assertRaises(AdmissionRejected) as cm:
+            async with controller.admit(deadline=time.monotonic() + 0.1):
+                pass
+        self.assertEqual(cm.exception.status_code, 503)
+        # Assert that the rejected request left the queue
+        self.assertEqual(controller._waiting, [])
+        release.set()
+        await holder
+
+    async def test_admit_serves_higher_priority_first(self):
+        controller = AdmissionController(
+            max_concurrency=1, max_queue_size=2, initial_service_time=0.01
+        )
+        order = []
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def run(name, priority):
+            async with controller.admit(
+                deadline=time.monotonic() + 10, priority=priority
+            ):
+                order.append(name)
+
+        holder = asyncio.create_task(
+            self.hold_slot(controller, started, release)
+        )
+        await started.wait()
+        low = asyncio.create_task(run("low", 2))
+        await self.wait_for_queue(controller, 1)
+        high = asyncio.create_task(run("high", 0))
+        await self.wait_for_queue(controller, 2)
+        release.set()
+        await asyncio.gather(holder, low, high)
+        # Assert that the later high priority request is served first
+        self.assertEqual(order, ["high", "low"])
+
+    async def test_only_completed_requests_update_service_time(self):
+        with self.assertRaises(AdmissionRejected):
+            async with self.controller.admit(deadline=time.monotonic() + 2):
+                raise AdmissionRejected(503, "Deadline is exceeded.", 0)
+        # Assert that the aborted request does not lower the estimate
+        self.assertEqual(self.controller.service_time, 1.0)
+
+        async with self.controller.admit(deadline=time.monotonic() + 2):
+            pass
+        self.assertLess(self.controller.service_time, 1.0)
+        self.assertEqual(self.controller._active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+import torch
+
+from src import engine
+from src.engine import (
+    BucketedModel,
+    TorchCPUEngine,
+    claim_worker_index,
+    configure_threads,
+    parse_int_list,
+)
+
+
+class TestParseIntList(unittest.TestCase):
+    def test_parse_int_list(self):
+        self.assertEqual(parse_int_list("0-3, 6"), [0, 1, 2, 3, 6])
+        self.assertEqual(parse_int_list(""), [])
+
+
+class TestConfigureThreads(unittest.TestCase):
+    @patch("src.engine.torch.set_num_interop_threads")
+    @patch("src.engine.torch.set_num_threads")
+    @patch("src.engine.os.sched_setaffinity")
+    def test_configure_threads_pins_worker_cores(
+        self, mock_setaffinity, mock_set_threads, mock_set_interop_threads
+    ):
+        configure_threads(2, 1, "0-3", worker_index=1)
+        # Assert that the second worker is pinned to the second slice
+        mock_setaffinity.assert_called_once_with(0, [2, 3])
+        mock_set_threads.assert_called_once_with(2)
+        mock_set_interop_threads.assert_called_once_with(1)
+
+    @patch("src.engine.os.sched_setaffinity")
+    def test_configure_threads_without_enough_cores(self, mock_setaffinity):
+        with self.assertRaises(ValueError):
+            configure_threads(2, 0, "0-3", worker_index=2)
+        mock_setaffinity.assert_not_called()
+
+    @patch("src.engine.os.sched_setaffinity")
+    def test_configure_threads_affinity_without_intra_op_threads(
+        self, mock_setaffinity
+    ):
+        # Assert that the slice size cannot be left to the torch default
+        with self.assertRaises(ValueError):
+            configure_threads(0, 0, "0-3")
+        mock_setaffinity.assert_not_called()
+
+
+class TestClaimWorkerIndex(unittest.TestCase):
+    def setUp(self):
+        self.lock_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        while engine._worker_locks:
+            engine._worker_locks.pop().close()
+        self.lock_dir.cleanup()
+
+    def test_claim_worker_index(self):
+        # Assert that every claim obtains a distinct slot until none is left
+        self.assertEqual(claim_worker_index(self.lock_dir.name, 2), 0)
+        self.assertEqual(claim_worker_index(self.lock_dir.name, 2), 1)
+        self.assertIsNone(claim_worker_index(self.lock_dir.name, 2))
+
+    def test_claim_worker_index_after_release(self):
+        claim_worker_index(self.lock_dir.name, 2)
+        engine._worker_locks.pop().close()
+        # Assert that the slot of a terminated worker is claimed again
+        self.assertEqual(claim_worker_index(self.lock_dir.name, 2), 0)
+
+
+class DummyQAModel(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.config = MagicMock()
+        self.linear = torch.nn.Linear(1, 2)
+
+    def forward(self, input_ids, attention_mask, return_dict=True):
+        logits = self.linear(input_ids.unsqueeze(-1).float())
+        logits = logits.masked_fill(~attention_mask.bool().unsqueeze(-1), -1e4)
+        return logits[..., 0], logits[..., 1]
+
+
+class TestBucketedModel(unittest.TestCase):
+    def test_forward_matches_eager_model(self):
+        model = DummyQAModel().eval()
+        inputs = {
+            "input_ids": torch.tensor([[1, 2, 3, 4, 5]]),
+            "attention_mask": torch.ones((1, 5), dtype=torch.long),
+        }
+        for graph in ("torchscript", "compile"):
+            with self.subTest(graph=graph):
+                bucketed = BucketedModel(
+                    model,
+                    input_names=["input_ids", "attention_mask"],
+                    shape_buckets=[4, 8],
+                    graph=graph,
+                    pad_token_id=0,
+                )
+                with torch.inference_mode():
+                    start, end = bucketed(**inputs)
+                    expected_start, expected_end = model(**inputs)
+                # Assert that padding to the bucket does not change the logits
+                self.assertEqual(start.shape, (1, 5))
+                self.assertTrue(torch.allclose(start, expected_start))
+                self.assertTrue(torch.allclose(end, expected_end))
+
+
+class TestTorchCPUEngine(unittest.TestCase):
+    def setUp(self):
+        self.question_answerer = MagicMock(
+            return_value={"answer": "answer", "score": 0.9}
+        )
+        self.question_answerer.model = DummyQAModel()
+
+    def test_call_runs_under_inference_mode(self):
+        def check_inference_mode(**kwargs):
+            self.assertTrue(torch.is_inference_mode_enabled())
+            return {"answer": "answer", "score": 0.9}
+
+        self.question_answerer.side_effect = check_inference_mode
+        engine = TorchCPUEngine(self.question_answerer)
+        result = engine(question="question", context="context")
+        self.assertEqual(result["answer"], "answer")
+
+    def test_quantize_replaces_linear_layers(self):
+        TorchCPUEngine(self.question_answerer, quantize=True)
+        self.assertIsInstance(
+            self.question_answerer.model.linear,
+            torch.ao.nn.quantized.dynamic.Linear,
+        )
+
+    def test_invalid_graph(self):
+        with self.assertRaises(ValueError):
+            TorchCPUEngine(self.question_answerer, graph="dummy")
+
+    def test_compile_with_quantize(self):
+        with self.assertRaises(ValueError):
+            TorchCPUEngine(
+                self.question_answerer, graph="compile", quantize=True
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
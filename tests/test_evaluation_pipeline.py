@@ -1,7 +1,16 @@
+import tempfile
 import unittest
+from argparse import Namespace
 from unittest.mock import patch, MagicMock
 
-from src.evaluate_pipeline import main
+from datasets import Dataset
+
+from src.evaluate_pipeline import (
+    evaluate_example,
+    evaluate_in_chunks,
+    main,
+    rescore_results,
+)
 
 
 class TestScript(unittest.TestCase):
@@ -15,6 +24,8 @@ class TestScript(unittest.TestCase):
             dataset_path="path/to/dataset",
             val_set_size=10,
             context_size=2,
+            output_dir=None,
+            rescore=False,
         )
 
         mock_dataset = MagicMock()
@@ -32,5 +43,95 @@ class TestScript(unittest.TestCase):
         mock_dataset.shuffle.assert_called_once_with(seed=42)
 
 
+class TestStreamingEvaluation(unittest.TestCase):
+    def setUp(self):
+        self.dataset = Dataset.from_list(
+            [
+                {
+                    "id": str(i),
+                    "question": f"question {i}",
+                    "context": f"context {i}",
+                    "answers": {"answer_start": [0], "text": ["answer"]},
+                }
+                for i in range(5)
+            ]
+        )
+        self.output_dir = tempfile.TemporaryDirectory()
+        self.args = Namespace(
+            pipeline="e2e",
+            val_set_size=None,
+            context_size=2,
+            dataset_path="path/to/dataset",
+            index_name="my_index",
+            model_name="my_model",
+            chunk_size=2,
+            output_dir=self.output_dir.name,
+        )
+        self.question_answerer = MagicMock(
+            return_value={"answer": "answer", "score": 0.9}
+        )
+
+    def tearDown(self):
+        self.output_dir.cleanup()
+
+    @patch("src.evaluate_pipeline.get_hits")
+    def test_evaluate_example(self, mock_get_hits):
+        mock_get_hits.return_value = [
+            {"id": "a", "context": "dummy"},
+            {"id": "b", "context": "context 0"},
+        ]
+        result = evaluate_example(
+            self.dataset[0], "e2e", "my_index", 2, None, self.question_answerer
+        )
+        self.assertEqual(result["retrieved_ids"], ["a", "b"])
+        self.assertEqual(result["mrr"], 0.5)
+        self.assertEqual(result["prediction"], "answer")
+        self.question_answerer.assert_called_once_with(
+            question="question 0", context="dummy context 0"
+        )
+
+    @patch("src.evaluate_pipeline.get_hits")
+    def test_evaluate_in_chunks_resumes(self, mock_get_hits):
+        mock_get_hits.return_value = [{"id": "a", "context": "context 0"}]
+
+        def interrupt_at_fourth_call(**kwargs):
+            if self.question_answerer.call_count == 4:
+                raise ConnectionError
+            return {"answer": "answer", "score": 0.9}
+
+        self.question_answerer.side_effect = interrupt_at_fourth_call
+        with self.assertRaises(ConnectionError):
+            evaluate_in_chunks(
+                self.dataset, self.args, None, self.question_answerer
+            )
+        # Assert that only the completed chunk is rescored with a warning
+        with self.assertLogs(level="WARNING"):
+            metrics = rescore_results(self.output_dir.name)
+        self.assertEqual(metrics["num_examples"], 2)
+
+        # Assert that the completed chunk is not evaluated again
+        evaluate_in_chunks(
+            self.dataset, self.args, None, self.question_answerer
+        )
+        self.assertEqual(self.question_answerer.call_count, 7)
+
+        metrics = rescore_results(self.output_dir.name)
+        self.assertEqual(metrics["num_examples"], 5)
+        self.assertAlmostEqual(metrics["mrr"], 0.2)
+        self.assertAlmostEqual(metrics["f1"], 100.0)
+        self.assertAlmostEqual(metrics["exact_match"], 100.0)
+
+    def test_evaluate_in_chunks_with_different_arguments(self):
+        evaluate_in_chunks(
+            self.dataset.select([]), self.args, None, self.question_answerer
+        )
+        self.args.context_size = 3
+        # Assert that results of a different run are not resumed
+        with self.assertRaises(ValueError):
+            evaluate_in_chunks(
+                self.dataset, self.args, None, self.question_answerer
+            )
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,9 @@
+import time
 import unittest
 from fastapi.testclient import TestClient
 from unittest.mock import patch
 
+from src.admission import AdmissionController, AdmissionRejected
 from src.main import app, get_context
 
 
@@ -58,6 +60,64 @@ class MyScriptTestCase(unittest.TestCase):
         # returns null
         self.assertEqual(response.json()["text"], "Answer is not found.")
 
+    @patch("src.main.admission_controller")
+    @patch("src.main.question_answerer")
+    def test_extract_rejected_by_admission_control(
+        self, mock_question_answerer, mock_admission_controller
+    ):
+        mock_admission_controller.admit.side_effect = AdmissionRejected(
+            429, "Admission queue is full.", 2.0
+        )
+        response = self.client.post(
+            "/extract",
+            json={"text": "question", "deadline": 1.0, "priority": "high"},
+        )
+        # Assert pipeline is not called when the request is not admitted
+        mock_question_answerer.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers["Retry-After"], "2")
+
+    @patch("src.main.get_context")
+    @patch("src.main.question_answerer")
+    def test_extract_rejected_before_retrieval(
+        self, mock_question_answerer, mock_get_context
+    ):
+        controller = AdmissionController(
+            max_concurrency=1, max_queue_size=1, initial_service_time=2.0
+        )
+        with patch("src.main.admission_controller", controller):
+            response = self.client.post(
+                "/extract", json={"text": "question", "deadline": 1.0}
+            )
+        # Assert that a request which cannot complete within its deadline is
+        # rejected without querying Elasticsearch
+        mock_get_context.assert_not_called()
+        self.assertEqual(response.status_code, 503)
+
+    @patch("src.main.get_context")
+    @patch("src.main.question_answerer")
+    def test_extract_deadline_exceeded_during_retrieval(
+        self, mock_question_answerer, mock_get_context
+    ):
+        controller = AdmissionController(
+            max_concurrency=1, max_queue_size=1, initial_service_time=0.0
+        )
+
+        def slow_get_context(**kwargs):
+            time.sleep(0.2)
+            return ["example1"]
+
+        mock_get_context.side_effect = slow_get_context
+        with patch("src.main.admission_controller", controller):
+            response = self.client.post(
+                "/extract", json={"text": "question", "deadline": 0.1}
+            )
+        # Assert that inference is skipped once retrieval used up the budget
+        mock_question_answerer.assert_not_called()
+        self.assertEqual(response.status_code, 503)
+        # Assert that the aborted request does not update the estimate
+        self.assertEqual(controller.service_time, 0.0)
+
 
 if __name__ == "__main__":
     unittest.main()
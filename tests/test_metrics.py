@@ -0,0 +1,53 @@
+import unittest
+
+from src.metrics import (
+    StreamingMRR,
+    StreamingSquad,
+    calculate_exact_match,
+    calculate_f1,
+    normalize_answer,
+)
+
+
+class TestSquadScores(unittest.TestCase):
+    def test_normalize_answer(self):
+        self.assertEqual(normalize_answer("The  Answer, is."), "answer is")
+
+    def test_calculate_f1(self):
+        self.assertEqual(calculate_f1("the answer", "Answer"), 1.0)
+        self.assertAlmostEqual(calculate_f1("answer here", "answer"), 2 / 3)
+        self.assertEqual(calculate_f1("dummy", "answer"), 0.0)
+
+    def test_calculate_exact_match(self):
+        self.assertEqual(calculate_exact_match("An answer!", "answer"), 1.0)
+        self.assertEqual(calculate_exact_match("answer here", "answer"), 0.0)
+
+
+class TestStreamingMRR(unittest.TestCase):
+    def test_compute(self):
+        mrr = StreamingMRR()
+        for value in (1, 0.5, 0, 1):
+            mrr.update(value)
+        metrics = mrr.compute()
+        self.assertAlmostEqual(metrics["mrr"], 0.625)
+        self.assertAlmostEqual(metrics["true_first_response_ratio"], 0.5)
+        self.assertAlmostEqual(metrics["uncaptured_true_answer_ratio"], 0.25)
+
+    def test_compute_without_updates(self):
+        self.assertEqual(StreamingMRR().compute(), {})
+
+
+class TestStreamingSquad(unittest.TestCase):
+    def test_compute(self):
+        squad = StreamingSquad()
+        # The best matching ground truth answer is taken into account
+        squad.update("answer", ["dummy", "the answer"])
+        squad.update("answer here", ["answer"])
+        squad.update(None, ["answer"])
+        metrics = squad.compute()
+        self.assertAlmostEqual(metrics["f1"], 100 * (1 + 2 / 3) / 3)
+        self.assertAlmostEqual(metrics["exact_match"], 100 / 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
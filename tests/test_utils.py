@@ -6,9 +6,11 @@ from elasticsearch import Elasticsearch
 
 from src.utils import (
     calculate_element_mrr,
+    calculate_reciprocal_rank,
     get_config,
     get_context,
     get_elastic_search_client,
+    get_hits,
     update_context,
     verify_config
 )
@@ -90,8 +92,8 @@ class TestGetContext(unittest.TestCase):
         results = {
             "hits": {
                 "hits": [
-                    {"_source": {"context": "example1"}},
-                    {"_source": {"context": "example2"}},
+                    {"_id": "1", "_source": {"context": "example1"}},
+                    {"_id": "2", "_source": {"context": "example2"}},
                 ]
             }
         }
@@ -115,6 +117,20 @@ class TestGetContext(unittest.TestCase):
         )
 
 
+class TestGetHits(unittest.TestCase):
+    def test_get_hits(self):
+        es = Mock(spec=Elasticsearch)
+        es.search.return_value = {
+            "hits": {
+                "hits": [{"_id": "1", "_source": {"context": "example1"}}]
+            }
+        }
+        result = get_hits("example question", "my_index", 1, es)
+
+        # Assert that both the document id and the context are returned
+        self.assertEqual(result, [{"id": "1", "context": "example1"}])
+
+
 class TestGetES(unittest.TestCase):
     def setUp(self):
         # Read config files for hyperpameters and ES related information
@@ -139,6 +155,18 @@ class TestGetES(unittest.TestCase):
             es.info()
 
 
+class TestCalculateReciprocalRank(unittest.TestCase):
+    def test_calculate_reciprocal_rank(self):
+        # Assert reciprocal rank depends on the position of the first match
+        contexts = ["dummy", "answer", "answer"]
+        self.assertEqual(calculate_reciprocal_rank("answer", contexts), 0.5)
+
+    def test_calculate_reciprocal_rank_without_answer(self):
+        # Assert reciprocal rank is 0 when the context is not retrieved
+        contexts = ["dummy", "dummy"]
+        self.assertEqual(calculate_reciprocal_rank("answer", contexts), 0.0)
+
+
 class TestCalculateElementMRR(unittest.TestCase):
     def setUp(self):
         self.example = {"context": "answer", "question": "dummy"}